@@ -0,0 +1,61 @@
+# bench_memory.py
+# Reports the memory used by the interpreter's runtime objects (frames,
+# environments, closures) and the peak memory of a deep evaluation.
+
+import sys
+import tracemalloc
+import dollop
+
+N = 10000
+
+def bytes_per(factory, n=N):
+    """ Create n objects with factory() and return the average number of
+        bytes allocated per object. """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory() for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return (after - before) / n
+
+def peak_eval(bi, s):
+    """ Evaluate s and return (result, peak bytes allocated). """
+    tracemalloc.start()
+    result = bi.eval(s)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+def main():
+    bi = dollop.BatchInterpreter()
+    env = bi._env
+    expr = ["+", 1, 2]
+    params, body = ["x"], ["*", "x", 2]
+    l = dollop.Lambda(params, body, env)
+
+    def make_call_env():
+        newenv = dollop.Environment(parent=l.env)
+        newenv.bind("x", 3)
+        return newenv
+
+    print("bytes per frame:       %7.1f"
+          % bytes_per(lambda: dollop.Frame(expr, env)))
+    print("bytes per environment: %7.1f" % bytes_per(make_call_env))
+    print("bytes per closure:     %7.1f"
+          % bytes_per(lambda: dollop.Lambda(params, body, env)))
+
+    depth = int(sys.argv[1]) if sys.argv[1:] else 200
+    bi.eval("""
+      (define count
+        (lambda (n)
+          (if (= n 0)
+              0
+              (+ 1 (count (- n 1))))))""")
+    result, peak = peak_eval(bi, "(count %d)" % depth)
+    assert result == depth
+    print("peak bytes, depth %d:  %7d (%d steps, max depth %d)"
+          % (depth, peak, bi._num_calls, bi._max_depth))
+
+if __name__ == "__main__":
+    main()
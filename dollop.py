@@ -37,6 +37,9 @@ And these built-in functions:
 (call/cc <lambda>)
 (eval expr)
 (apply f args)
+(map f lst)
+(pmap f lst)               [like map, but may run in worker processes;
+                            only where the 'fork' start method exists]
 
 TODO:
 
@@ -47,7 +50,12 @@ TODO:
 
 """
 
+import atexit
 import copy
+import io
+import multiprocessing
+import os
+import pickle
 import re
 import types
 
@@ -128,6 +136,7 @@ def convert_token(token):
     return token
     
 class Environment:
+    __slots__ = ('_data', '_parent')
     def __init__(self, parent=None):
         self._data = {}
         self._parent = parent
@@ -151,6 +160,7 @@ def with_name(f, name):
     return f        
     
 class Frame:
+    __slots__ = ('expr', 'env', 'done')
     def __init__(self, expr, env):
         self.expr = expr
         self.env = env
@@ -159,21 +169,32 @@ class Frame:
         return lisp_repr(self.expr)
     
 class Lambda:
+    __slots__ = ('_params', '_body', 'env')
     def __init__(self, params, body, env):
         self._params = params
         self._body = body
         self.env = env
-    def params(self): return self._params[:]
+    def params(self): return self._params
+    # the parameter list is never evaluated, so it's never changed in-place
+    # either; callers must not modify it, but we don't need to copy it.
     def body(self): return copy.deepcopy(self._body)
     # since we change expression in-place elsewhere, this should always be
     # a fresh copy w/o dependencies
     # alternatively, we could try to *not* change things in-place. :-}
     
 class Continuation:
+    __slots__ = ('stack',)
     def __init__(self, stack):
         self.stack = copy.deepcopy(stack)
     
 PLACEHOLDER = 42j
+NOT_DONE = object() # pmap result that still has to be computed serially
+MAX_FREE_FRAMES = 256 # max number of frames kept around for reuse
+PMAP_MIN_ITEMS = 64 # pmap on shorter lists is done serially
+PMAP_WORKERS = None # number of worker processes for pmap; None = one per core
+PMAP_START_METHOD = 'fork' # others re-import __main__, which may not be safe
+PICKLE_ERRORS = (pickle.PicklingError, AttributeError, TypeError,
+                 RecursionError)
 SPECIAL_FORMS = ["begin", "define", "if", "lambda", "quote"]
 
 def sf_apply(expr, env):
@@ -245,8 +266,10 @@ class BatchInterpreter:
     def __init__(self):
         self._call_stack = []
         self._env = self._create_toplevel_env()
+        self._builtins = dict(self._env._data)
         self._num_calls = 0
         self._max_depth = 0
+        self._free_frames = []
 
     def _create_toplevel_env(self):
         env = Environment()
@@ -258,6 +281,8 @@ class BatchInterpreter:
         env.bind('call/cc', with_name(lambda f: self.s_call_cc(f), 'call/cc'))
         env.bind('eval', with_name(lambda e: self.s_eval(e), 'eval'))
         env.bind('apply', with_name(lambda f, a: self.s_apply(f, a), 'apply'))
+        env.bind('map', with_name(lambda f, l: self.s_map(f, l), 'map'))
+        env.bind('pmap', with_name(lambda f, l: self.s_pmap(f, l), 'pmap'))
         env.bind('magic', 42) # pre-defined variable
         return env
     
@@ -265,7 +290,9 @@ class BatchInterpreter:
         """ Execute the next step in the evaluation process. If we're done with
             the evaluation, return the result, otherwise None. """
         self._num_calls += 1
-        self._max_depth = max(self._max_depth, len(self._call_stack))
+        depth = len(self._call_stack)
+        if depth > self._max_depth:
+            self._max_depth = depth
             
         # what's on the call stack?
         frame = self._call_stack[-1]
@@ -283,21 +310,24 @@ class BatchInterpreter:
                         return self._collapse(result)
                     else:
                         self._call_stack.pop()
-                        new_frame = Frame(expr=result, env=frame.env)
+                        new_frame = self._new_frame(result, frame.env)
                         self._call_stack.append(new_frame)
+                        self._free_frame(frame)
                         return None
                 elif isinstance(expr[0], Lambda):
                     f = expr[0]
                     # create new env (with lambda's env as parent)
                     newenv = Environment(parent=f.env)
                     # assign variables
-                    assert len(expr[1:]) == len(f.params())
-                    for name, value in zip(f.params(), expr[1:]):
+                    params = f.params()
+                    assert len(expr) - 1 == len(params)
+                    for name, value in zip(params, expr[1:]):
                         newenv.bind(name, value)
-                    newframe = Frame(expr=f.body(), env=newenv)
+                    newframe = self._new_frame(f.body(), newenv)
                     # then evaluate lambda body in that env!
                     self._call_stack.pop()
                     self._call_stack.append(newframe)
+                    self._free_frame(frame)
                     # no TCO here because this version of lambda only
                     # takes one expression... but BEGIN will have TCO, yes?
                     return None
@@ -314,7 +344,7 @@ class BatchInterpreter:
                 if plpos > -1:
                     subexpr = expr[plpos]
                     expr[plpos] = PLACEHOLDER
-                    newframe = Frame(expr=subexpr, env=frame.env) # VERIFY env
+                    newframe = self._new_frame(subexpr, frame.env) # VERIFY env
                     self._call_stack.append(newframe)
                     return None
                 else:
@@ -329,7 +359,7 @@ class BatchInterpreter:
             # extract subexpr, substitute with placeholder, push subexpr
             subexpr = expr[0]
             expr[0] = PLACEHOLDER
-            newframe = Frame(expr=subexpr, env=frame.env) # VERIFY env
+            newframe = self._new_frame(subexpr, frame.env) # VERIFY env
             self._call_stack.append(newframe)
             return None
                 
@@ -360,38 +390,65 @@ class BatchInterpreter:
                 plpos = sf_next(parent_expr, plpos+1)
                 if plpos == -1:
                     self._call_stack[-1].done = True
+                    self._free_frame(parent_frame)
                     return None
                 else:
                     subexpr = parent_expr[plpos]
                     parent_expr[plpos] = PLACEHOLDER
-                    newframe = Frame(expr=subexpr, env=parent_frame.env) # VERIFY
+                    newframe = self._new_frame(subexpr, parent_frame.env) # VERIFY
                     self._call_stack.append(newframe)
+                    self._free_frame(parent_frame)
                     return None
                 
             else:
                 # normal evaluation
                 if len(parent_expr) == plpos+1:
                     self._call_stack[-1].done = True
+                    self._free_frame(parent_frame)
                     return None
                 else:
                     # try next subexpr
                     plpos += 1
                     subexpr = parent_expr[plpos]
                     parent_expr[plpos] = PLACEHOLDER
-                    newframe = Frame(expr=subexpr, env=parent_frame.env) # VERIFY
+                    newframe = self._new_frame(subexpr, parent_frame.env) # VERIFY
                     self._call_stack.append(newframe)
+                    self._free_frame(parent_frame)
                     return None
             
     def eval(self, s):
         self.feed(s)
+        return self._eval_feed()
         
+    def _eval_feed(self):
+        """ Run the expression that was fed until we have a result. """
         while True:
             result = self.run()
             if result is not None:
                 return result
                 
+    def _new_frame(self, expr, env):
+        """ Return a frame for expr and env, reusing a previously freed frame
+            if there is one. """
+        if self._free_frames:
+            frame = self._free_frames.pop()
+            frame.expr = expr
+            frame.env = env
+            frame.done = False
+            return frame
+        return Frame(expr, env)
+
+    def _free_frame(self, frame):
+        """ Put a frame that is no longer on the call stack on the free list.
+            The frame must not be referenced anywhere else. """
+        if len(self._free_frames) < MAX_FREE_FRAMES:
+            frame.expr = frame.env = None # don't keep these alive
+            self._free_frames.append(frame)
+
     def _feed(self, expr):
-        frame = Frame(expr=expr, env=self._env)
+        for frame in self._call_stack:
+            self._free_frame(frame)
+        frame = self._new_frame(expr, self._env)
         self._call_stack = [frame]
         self._num_calls = 0
         
@@ -424,9 +481,9 @@ class BatchInterpreter:
         newenv = Environment(parent=f.env)
         # assign variable
         newenv.bind(f.params()[0], with_name(g, "<cont>"))
-        newframe = Frame(expr=f.body(), env=newenv)
+        newframe = self._new_frame(f.body(), newenv)
         # then evaluate lambda body in that env!
-        self._call_stack.pop()
+        self._free_frame(self._call_stack.pop())
         self._call_stack.append(newframe)
 
         # we just manipulate the call stack, but don't return a value
@@ -434,17 +491,210 @@ class BatchInterpreter:
         
     def s_eval(self, expr):
         env = self._call_stack[-1].env
-        newframe = Frame(expr=expr, env=env)
-        self._call_stack.pop()
+        newframe = self._new_frame(expr, env)
+        self._free_frame(self._call_stack.pop())
         self._call_stack.append(newframe)
         return None
         
     def s_apply(self, f, args):
         print(">>apply: call stack is: ", self.call_stack_repr())
         expr = [f] + args # already evaluated
-        newframe = Frame(expr=expr, env=self._env)
+        newframe = self._new_frame(expr, self._env)
         newframe.done = True
-        self._call_stack.pop() # remove (apply ...) expression
+        self._free_frame(self._call_stack.pop()) # remove (apply ...) expression
         self._call_stack.append(newframe) # replace with (f ...args...)
         return None
-        
\ No newline at end of file
+
+    def s_map(self, f, lst, results=None):
+        """ Replace (map f lst) with (list (f (quote x1)) .. (f (quote xN))),
+            so lambdas are applied on our own call stack. Values are quoted
+            because they have already been evaluated. If results is given,
+            elements whose result is known (i.e. not NOT_DONE) are replaced
+            with (quote result) instead. """
+        if results is None:
+            results = [NOT_DONE] * len(lst)
+        expr = [self._builtins['list']]
+        for x, result in zip(lst, results):
+            if result is NOT_DONE:
+                expr.append([f, ['quote', x]])
+            else:
+                expr.append(['quote', result])
+        newframe = self._new_frame(expr, self._env)
+        self._free_frame(self._call_stack.pop()) # remove (map ...) expression
+        self._call_stack.append(newframe)
+        return None
+        
+    def s_pmap(self, f, lst):
+        results = self._pmap(f, lst)
+        if results is None:
+            return self.s_map(f, lst) # fall back to serial map
+        if any(result is NOT_DONE for result in results):
+            return self.s_map(f, lst, results) # compute the rest serially
+        return results
+        
+    def _pmap(self, f, lst):
+        """ Apply f to the elements of lst in worker processes, and return
+            the results in order. Return None if the list is too small, or
+            if f cannot be sent to a worker.
+            
+            Toplevel bindings that cannot be pickled (e.g. a continuation
+            kept with (define saved k)) are not sent. If a worker fails to
+            look up a name because of that, or if its results cannot be
+            pickled, the results for that chunk are NOT_DONE, to be
+            computed serially by the caller; other chunks are not affected.
+        """
+        if _in_worker or len(lst) < PMAP_MIN_ITEMS:
+            return None
+        pool, size = _get_pool()
+        if pool is None:
+            return None
+        # chunks are the unit of serial recomputation; they're grouped into
+        # one task per worker, so f and the toplevel (the header) are
+        # pickled once, and sent once per worker rather than once per chunk
+        chunksize = -(-len(lst) // (size * 4))
+        chunks = [lst[i:i+chunksize] for i in range(0, len(lst), chunksize)]
+        header = self._pmap_header(f)
+        if header is None:
+            return None
+        try:
+            chunk_data = [self._dumps(chunk) for chunk in chunks]
+        except PICKLE_ERRORS:
+            return None
+        groupsize = -(-len(chunk_data) // size)
+        tasks = [(header, chunk_data[i:i+groupsize])
+                 for i in range(0, len(chunk_data), groupsize)]
+        datas = [data for group in pool.map(_pmap_worker, tasks)
+                 for data in group]
+        results = []
+        for chunk, data in zip(chunks, datas):
+            if data is None:
+                results.extend([NOT_DONE] * len(chunk))
+            else:
+                results.extend(self._loads(data))
+        return results
+        
+    def _pmap_header(self, f):
+        """ Pickle (f, toplevel, skipped) for _pmap_worker, where toplevel
+            holds the toplevel bindings other than the built-ins, and skipped
+            lists the names of bindings that could not be pickled. Return
+            None if f itself cannot be pickled. """
+        toplevel = dict((name, value)
+                        for name, value in self._env._data.items()
+                        if self._builtins.get(name) is not value)
+        try:
+            return self._dumps((f, toplevel, []))
+        except PICKLE_ERRORS:
+            pass
+        # find the bindings that are the problem, and leave them out
+        skipped = []
+        for name, value in list(toplevel.items()):
+            try:
+                self._dumps(value)
+            except PICKLE_ERRORS:
+                del toplevel[name]
+                skipped.append(name)
+        try:
+            return self._dumps((f, toplevel, skipped))
+        except PICKLE_ERRORS:
+            return None
+        
+    def _dumps(self, obj):
+        f = io.BytesIO()
+        _Pickler(f, self).dump(obj)
+        return f.getvalue()
+        
+    def _loads(self, data):
+        return _Unpickler(io.BytesIO(data), self).load()
+
+
+class _Pickler(pickle.Pickler):
+    """ Pickler that refers to the toplevel environment and the built-in
+        functions of an interpreter by name, rather than by value. The
+        receiving interpreter substitutes its own. """
+    def __init__(self, f, interp):
+        pickle.Pickler.__init__(self, f, pickle.HIGHEST_PROTOCOL)
+        self._interp = interp
+    def persistent_id(self, obj):
+        if obj is self._interp._env:
+            return ('toplevel',)
+        if isinstance(obj, types.FunctionType):
+            name = getattr(obj, 'name', None)
+            if self._interp._builtins.get(name) is obj:
+                return ('builtin', name)
+        return None
+        
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, f, interp):
+        pickle.Unpickler.__init__(self, f)
+        self._interp = interp
+    def persistent_load(self, pid):
+        if pid[0] == 'toplevel':
+            return self._interp._env
+        return self._interp._builtins[pid[1]]
+
+_pool = None
+_pool_size = 0
+_in_worker = False
+
+def _cpu_count():
+    """ Return the number of CPUs this process may run on. Unlike
+        multiprocessing.cpu_count(), this takes CPU affinity into account. """
+    if hasattr(os, 'process_cpu_count'): # Python 3.13+
+        return os.process_cpu_count() or 1
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+def _get_pool():
+    """ Return a 2-tuple (pool, size) with the process pool used by pmap,
+        creating it if necessary. pool is None if there's only one worker, or
+        if PMAP_START_METHOD is not available on this platform. """
+    global _pool, _pool_size
+    if _pool is None:
+        if PMAP_START_METHOD not in multiprocessing.get_all_start_methods():
+            return None, 0
+        _pool_size = PMAP_WORKERS or _cpu_count()
+        if _pool_size < 2:
+            return None, 0
+        context = multiprocessing.get_context(PMAP_START_METHOD)
+        _pool = context.Pool(_pool_size)
+        atexit.register(_close_pool)
+    return _pool, _pool_size
+    
+def _close_pool():
+    global _pool
+    atexit.unregister(_close_pool)
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+    
+def _pmap_worker(payload):
+    """ Apply a function to chunks of values in a fresh interpreter. payload
+        is a 2-tuple (header, chunks) of pickled (f, toplevel, skipped) and a
+        list of pickled chunks. Return a list with, for each chunk, the
+        pickled results, or None if they can't be pickled or if a name in
+        skipped was needed. """
+    global _in_worker
+    _in_worker = True # no nested pools
+    bi = BatchInterpreter()
+    header, chunks = payload
+    f, toplevel, skipped = bi._loads(header)
+    for name, value in toplevel.items():
+        bi._env.bind(name, value)
+    return [_pmap_chunk(bi, f, skipped, bi._loads(data)) for data in chunks]
+    
+def _pmap_chunk(bi, f, skipped, chunk):
+    results = []
+    for x in chunk:
+        bi._feed([f, ['quote', x]])
+        try:
+            results.append(bi._eval_feed())
+        except NameError:
+            if skipped:
+                return None # may be bound in the caller's toplevel
+            raise
+    try:
+        return bi._dumps(results)
+    except PICKLE_ERRORS:
+        return None
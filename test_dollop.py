@@ -1,9 +1,32 @@
 # test_dollop.py
 
+import multiprocessing
 import unittest
 #
 import dollop
 
+FAC = """
+  (define fac
+    (lambda (n)
+      (if (= n 1)
+          1
+          (* n (fac (- n 1))))))"""
+
+class PmapSettings:
+    """ Temporarily change the pmap settings; closes the pool on exit. """
+    def __init__(self, min_items, workers, start_method='fork'):
+        self._settings = (min_items, workers, start_method)
+    def __enter__(self):
+        self._old = (dollop.PMAP_MIN_ITEMS, dollop.PMAP_WORKERS,
+                     dollop.PMAP_START_METHOD)
+        self._set(self._settings)
+    def __exit__(self, *exc_info):
+        self._set(self._old)
+        dollop._close_pool()
+    def _set(self, settings):
+        (dollop.PMAP_MIN_ITEMS, dollop.PMAP_WORKERS,
+         dollop.PMAP_START_METHOD) = settings
+
 class TestDollop(unittest.TestCase):
     
     def test_tokenize(self):
@@ -212,6 +235,99 @@ class TestDollop(unittest.TestCase):
         self.assertEquals(result, 3628800)
         self.assertEquals(bi._max_depth, 3) # 1 for fac calls
         
+    def test_frame_reuse(self):
+        bi = dollop.BatchInterpreter()
+        self.assertEquals(bi.eval("(+ (+ 1 2) (+ 3 4))"), 10)
+        self.assert_(bi._free_frames)
+        for frame in bi._free_frames:
+            self.assertEquals(frame.expr, None)
+            self.assertEquals(frame.env, None)
+        
+        # freed frames are handed out again
+        old_frames = bi._free_frames + bi._call_stack
+        bi.feed("(+ 1 2)")
+        self.assert_(any(bi._call_stack[0] is f for f in old_frames))
+        frame = bi._call_stack[0]
+        self.assertEquals(bi.eval("(+ 1 (call/cc (lambda (k) (+ 2 (k 3)))))"),
+          4)
+        
+        self.assertFalse(hasattr(frame, '__dict__'))
+        self.assertFalse(hasattr(bi._env, '__dict__'))
+        
+    def test_map(self):
+        bi = dollop.BatchInterpreter()
+        self.assertEquals(bi.eval("(map (lambda (x) (* x x)) (list 1 2 3))"),
+          [1, 4, 9])
+        self.assertEquals(bi.eval("(map (lambda (x) x) (quote (a (b c))))"),
+          ["a", ["b", "c"]])
+        self.assertEquals(bi.eval("(map list (list 1 2))"), [[1], [2]])
+        self.assertEquals(bi.eval("(map list (list))"), [])
+        
+    def test_pmap(self):
+        with PmapSettings(min_items=4, workers=2):
+            bi = dollop.BatchInterpreter()
+            bi.eval(FAC)
+            
+            # small input: serial
+            self.assertEquals(bi.eval("(pmap fac (list 3 4))"), [6, 24])
+            
+            # continuations can't be pickled: serial
+            self.assertEquals(bi.eval("""
+              (call/cc (lambda (k) 
+                (pmap (lambda (x) (k x)) (list 1 2 3 4))))"""), 1)
+                
+        # no usable start method: serial
+        with PmapSettings(min_items=4, workers=2, start_method='bogus'):
+            self.assertEquals(bi.eval("(pmap fac (list 1 2 3 4))"),
+              [1, 2, 6, 24])
+            self.assert_(dollop._pool is None)
+            
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                         "pmap needs the 'fork' start method")
+    def test_pmap_parallel(self):
+        with PmapSettings(min_items=4, workers=2):
+            bi = dollop.BatchInterpreter()
+            bi.eval(FAC)
+            # parallel, calling a toplevel function and using a closure
+            self.assertEquals(bi.eval("""
+              ((lambda (k)
+                 (pmap (lambda (n) (+ k (fac n))) (list 1 2 3 4 5 6)))
+               100)"""), [101, 102, 106, 124, 220, 820])
+            self.assert_(dollop._pool is not None)
+            self.assertEquals(bi.eval("(pmap list (list 1 2 3 4))"),
+              [[1], [2], [3], [4]])
+              
+            # unpicklable toplevel bindings are skipped; only the chunks
+            # that need them, or whose results can't be pickled, are
+            # computed serially
+            bi.eval("(define saved (call/cc (lambda (k) k)))")
+            f = bi.eval("(lambda (n) (+ 1 n))")
+            self.assertEquals(bi._pmap(f, [1, 2, 3, 4]), [2, 3, 4, 5])
+            f = bi.eval("(lambda (n) (if (= n 3) saved n))")
+            results = bi._pmap(f, [1, 2, 3, 4])
+            self.assertEquals(results[:2] + results[3:], [1, 2, 4])
+            self.assert_(results[2] is dollop.NOT_DONE)
+            results = bi.eval("""
+              (pmap (lambda (n) (if (= n 3) saved n)) (list 1 2 3 4))""")
+            self.assertEquals(results[:2] + results[3:], [1, 2, 4])
+            self.assert_(results[2] is bi._env.get('saved')[1])
+            results = bi.eval("""
+              (pmap (lambda (n) (if (= n 3) (call/cc (lambda (k) k)) n))
+                    (list 1 2 3 4))""")
+            self.assertEquals(results[:2] + results[3:], [1, 2, 4])
+            self.assertEquals(results[2].name, "<cont>")
+            
+            # values nested too deeply to pickle are skipped as well
+            deep = []
+            for i in range(3000):
+                deep = [deep]
+            bi2 = dollop.BatchInterpreter()
+            bi2._env.bind('deep', deep)
+            self.assertEquals(bi2.eval("(pmap (lambda (n) 1) (list 1 2 3 4))"),
+              [1, 1, 1, 1])
+            f = bi2.eval("(lambda (n) (+ 1 n))")
+            self.assertEquals(bi2._pmap(f, [1, 2, 3, 4]), [2, 3, 4, 5])
+        
     def acs(self, bi, s):
         self.assertEquals(bi.call_stack_repr(), s)
         
\ No newline at end of file